@@ -6,34 +6,41 @@ and uses Gemini to generate complete implementation directives for Cursor/Windsu
 """
 
 import asyncio
+import base64
+import io
 import json
+import mmap
 import os
 import sys
-import yaml
+import threading
+import zlib
+import pathspec
 import fnmatch
-import pathlib
-import subprocess
-import tempfile
-import shutil
-from pathlib import Path
-from typing import Dict, List, Optional, Set, Union, Any, Tuple
+import heapq
+import operator
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Union, Any, Tuple
 from dataclasses import dataclass, field
+from functools import cached_property, lru_cache
 import re
-import mimetypes
 from datetime import datetime
-import textwrap
+from xml.sax.saxutils import quoteattr
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson  # Optional speedup, installed with the "fast" extra
+except ImportError:
+    orjson = None
 
 # MCP imports
 from mcp.server import Server
 from mcp.server.models import InitializationOptions
 from mcp.server.stdio import stdio_server
 from mcp.types import (
-    Resource,
     Tool,
     TextContent,
     ImageContent,
-    EmbeddedResource,
-    LoggingLevel
+    EmbeddedResource
 )
 
 @dataclass
@@ -76,6 +83,123 @@ class ProjectConfig:
         # Database files
         "*.db", "*.sqlite", "*.sqlite3",
     ]
+    
+    @cached_property
+    def exclusion_matcher(self) -> Tuple["re.Pattern", frozenset, frozenset, frozenset]:
+        """Compiled form of exclude_patterns + DEFAULT_EXCLUSIONS, built once per config"""
+        # Cached on first use, so later changes to exclude_patterns are not seen
+        return _build_exclusion_matcher(self.exclude_patterns + self.DEFAULT_EXCLUSIONS)
+
+# Pure suffix globs such as "*.pyc", which reduce to an extension lookup
+_EXTENSION_PATTERN = re.compile(r'\*\.([A-Za-z0-9]+)')
+
+def _build_exclusion_matcher(patterns: List[str]) -> Tuple["re.Pattern", frozenset, frozenset, frozenset]:
+    """Compile exclusion patterns into (regex, names, dir_names, extensions)"""
+    names = set()
+    dir_names = set()
+    extensions = set()
+    regexes = []
+    for pattern in patterns:
+        is_dir = pattern.endswith('/')
+        body = pattern.rstrip('/')
+        if not body:
+            continue
+        suffix = None if is_dir else _EXTENSION_PATTERN.fullmatch(body)
+        if suffix:
+            extensions.add(suffix.group(1))
+        elif any(c in body for c in '*?['):
+            # A trailing slash means "anything inside a matching directory"
+            regexes.append(fnmatch.translate(pattern + '*' if is_dir else pattern))
+        elif '/' not in body:
+            # Names match any path component; "build/" only matches parent directories
+            (dir_names if is_dir else names).add(sys.intern(body))
+        else:
+            # Literal sub-path, matched on path component boundaries
+            regexes.append(r'(?:.*/)?' + re.escape(body) + (r'/.*' if is_dir else r'(?:/.*)?') + r'\Z')
+    
+    # Every alternative is anchored at the start, so match() needs a single pass.
+    # An alternation that can never match keeps the call sites branch-free
+    combined = '|'.join(f'(?:{r})' for r in regexes) or r'(?!)'
+    return re.compile(combined, re.DOTALL), frozenset(names), frozenset(dir_names), frozenset(extensions)
+
+def _excluded_dir_names(patterns: List[str]) -> frozenset:
+    """Collect the plain directory names (e.g. ``node_modules/``) from exclusion patterns"""
+    return frozenset(
+        sys.intern(p.rstrip('/')) for p in patterns
+        if p.endswith('/') and '/' not in p[:-1] and not any(c in p for c in '*?[')
+    )
+
+# File reads are I/O-bound and release the GIL, so they are spread over a thread pool
+READ_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# How many reads may be in flight ahead of the writer; bounds memory held by results
+READ_AHEAD = READ_WORKERS * 4
+# Up to this many files are read inline, where starting threads would cost more than it saves
+SERIAL_READ_LIMIT = 8
+
+# Scanning a directory through an fd makes each entry's stat() relative to that directory
+_SCANDIR_FD = os.scandir in os.supports_fd and hasattr(os, 'O_DIRECTORY')
+
+# Files with a NUL byte in their first block are treated as binary, like git does
+BINARY_SNIFF_SIZE = 8192
+# Read size for files that turn out larger than their stat() size
+READ_CHUNK_SIZE = 64 * 1024
+# Files above this size are memory-mapped and decoded in place rather than read()
+MMAP_THRESHOLD = 64 * 1024
+
+# Directory-tree indentation by depth, so deep trees don't rebuild the same strings
+_INDENTS = [' ' * 2 * level for level in range(64)]
+
+def _indent(level: int) -> str:
+    return _INDENTS[level] if level < len(_INDENTS) else ' ' * 2 * level
+
+# Characters quoteattr must escape, or that make it switch quote style
+_XML_ATTR_SPECIAL = re.compile(r'[&<>"\n\r\t]')
+
+def _xml_attr(value: str) -> str:
+    """Same as quoteattr(value), without its escape passes when there is nothing to escape"""
+    if _XML_ATTR_SPECIAL.search(value) is None:
+        return '"' + value + '"'
+    return quoteattr(value)
+
+def _json_dumps_indented(obj: Any) -> str:
+    """json.dumps(obj, indent=2, ensure_ascii=False), done by orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    # orjson always writes non-ASCII characters as they are, so both paths agree
+    return json.dumps(obj, indent=2, ensure_ascii=False)
+
+# Tool output is split into TextContent blocks of about this many characters
+TEXT_CHUNK_SIZE = 4 * 1024 * 1024
+# Each result cache holds generated text totalling at most this many characters
+RESULT_CACHE_CHARS = 64 * 1024 * 1024
+
+# Directories that are never worth descending into
+EXCLUDED_DIR_NAMES = _excluded_dir_names(ProjectConfig.DEFAULT_EXCLUSIONS)
+
+def _iter_files(root: str, excluded_dirs: frozenset = EXCLUDED_DIR_NAMES,
+                include_dirs: bool = False,
+                prune: Optional[Callable[[os.DirEntry], bool]] = None):
+    """Yield a DirEntry for every file under root, top-down like os.walk"""
+    # Directories named in excluded_dirs or for which prune returns True are never opened.
+    # With include_dirs, the directories descended into are yielded as well.
+    stack = deque([root])
+    while stack:
+        subdirs = []
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        # Like os.walk, don't follow symlinked directories
+                        if (not entry.is_symlink() and entry.name not in excluded_dirs
+                                and not (prune and prune(entry))):
+                            subdirs.append(entry.path)
+                            if include_dirs:
+                                yield entry
+                    else:
+                        yield entry
+        except OSError:
+            continue
+        stack.extend(reversed(subdirs))
 
 class TokenEstimator:
     """Estimates token counts for different LLM providers"""
@@ -88,11 +212,22 @@ class TokenEstimator:
         "generic": 4.0      # Safe default
     }
     
+    # Last provider looked up and its ratio, kept as one tuple so threads swap it atomically
+    _last_ratio: Tuple[str, float] = ("generic", 4.0)
+    
     @classmethod
     def estimate_tokens(cls, text: str, provider: str = "generic") -> int:
         """Estimate token count for given text and provider"""
-        ratio = cls.TOKEN_RATIOS.get(provider.lower(), cls.TOKEN_RATIOS["generic"])
-        return int(len(text) / ratio)
+        return int(len(text) / cls._ratio_for(provider))
+    
+    @classmethod
+    def _ratio_for(cls, provider: str) -> float:
+        """Return the chars-per-token ratio, skipping lower() and the dict when the provider repeats"""
+        last_provider, ratio = cls._last_ratio
+        if provider is not last_provider:
+            ratio = cls.TOKEN_RATIOS.get(provider.lower(), cls.TOKEN_RATIOS["generic"])
+            cls._last_ratio = (provider, ratio)
+        return ratio
     
     @classmethod
     def get_context_limits(cls) -> Dict[str, int]:
@@ -107,29 +242,137 @@ class TokenEstimator:
             "gemini-2.0-flash": 1_000_000,
         }
 
+def _tree_fingerprint(root: str, root_stat: Optional[os.stat_result] = None,
+                      prune: Optional[Callable[[os.DirEntry], bool]] = None) -> int:
+    """Hash the path, size and mtime of every file and directory under root"""
+    # Pass the converter's _dir_pruner so trees it never opens are not walked here either
+    stats = [(root_stat or os.stat(root)).st_mtime_ns]
+    for entry in _iter_files(root, include_dirs=True, prune=prune):
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        stats.append((entry.path, st.st_size, st.st_mtime_ns))
+    return hash(tuple(stats))
+
+# Skip the atime update on Linux; the kernel refuses it for files we don't own
+_O_NOATIME = getattr(os, 'O_NOATIME', 0)
+# Raw reads on Windows must not translate newlines
+_O_BINARY = getattr(os, 'O_BINARY', 0)
+
+def _read_file(file_path: str, size: Optional[int] = None) -> Tuple[Optional[str], Optional[Exception]]:
+    """Read a text file, returning (content, None), (None, error), or (None, None) if binary"""
+    try:
+        fd = _open_raw(file_path)
+        try:
+            # A size already known from scandir saves the fstat() call
+            if size is None:
+                size = os.fstat(fd).st_size
+            if size > MMAP_THRESHOLD:
+                with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as data:
+                    return _decode_file(data)
+            return _decode_file(_read_fd(fd, size))
+        finally:
+            os.close(fd)
+    except Exception as e:
+        return None, e
+
+def _read_file_bytes(file_path: str, size: Optional[int] = None) -> Tuple[Optional[bytes], Optional[Exception]]:
+    """Like _read_file, but return the content as UTF-8 bytes"""
+    try:
+        fd = _open_raw(file_path)
+        try:
+            data = _read_fd(fd, os.fstat(fd).st_size if size is None else size)
+        finally:
+            os.close(fd)
+    except Exception as e:
+        return None, e
+    if data.find(b'\x00', 0, BINARY_SNIFF_SIZE) != -1:
+        return None, None
+    # ASCII without carriage returns decodes to itself, so it is returned as read
+    if not data.isascii() or b'\r' in data:
+        data = _decode_text(data).encode('utf-8')
+    return data, None
+
+def _open_raw(file_path: str) -> int:
+    """Open a file for raw reading, without updating its atime where allowed"""
+    try:
+        return os.open(file_path, os.O_RDONLY | _O_BINARY | _O_NOATIME)
+    except PermissionError:
+        if not _O_NOATIME:
+            raise
+        return os.open(file_path, os.O_RDONLY | _O_BINARY)
+
+def _decode_file(data) -> Tuple[Optional[str], None]:
+    """Decode a file's bytes or mmap as in _read_file, returning (None, None) if binary"""
+    if data.find(b'\x00', 0, BINARY_SNIFF_SIZE) != -1:
+        return None, None
+    return _decode_text(data), None
+
+def _read_fd(fd: int, size: int) -> bytes:
+    """Read everything from fd, expecting size bytes"""
+    # Asking for one extra byte tells us in the same call whether the file grew
+    data = os.read(fd, size + 1)
+    if len(data) <= size:
+        return data
+    parts = [data]
+    while True:
+        chunk = os.read(fd, READ_CHUNK_SIZE)
+        if not chunk:
+            return b''.join(parts)
+        parts.append(chunk)
+
+def _decode_text(data) -> str:
+    """Decode file bytes the way text-mode open() would: lenient UTF-8, universal newlines"""
+    # str() decodes any buffer, so an mmap is decoded without copying it to bytes first
+    text = str(data, 'utf-8', 'ignore')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+def _index_indicators(indicators: Dict[str, List[str]]) -> Tuple[Dict[str, List[str]], List[Tuple[str, str]]]:
+    """Split indicator files into a filename -> project types map and (suffix, type) pairs for '*' globs"""
+    names: Dict[str, List[str]] = {}
+    suffixes = []
+    for proj_type, files in indicators.items():
+        for file_pattern in files:
+            if file_pattern.startswith('*'):
+                suffixes.append((file_pattern[1:], proj_type))
+            else:
+                names.setdefault(file_pattern, []).append(proj_type)
+    return names, suffixes
+
 class RepoAnalyzer:
     """Analyzes repository structure and suggests optimal configurations"""
     
+    PROJECT_INDICATORS = {
+        "python": ["requirements.txt", "setup.py", "pyproject.toml", "Pipfile"],
+        "node": ["package.json", "yarn.lock", "package-lock.json"],
+        "react": ["package.json"],  # Check for react in deps
+        "vue": ["vue.config.js", "nuxt.config.js"],
+        "go": ["go.mod", "go.sum"],
+        "rust": ["Cargo.toml", "Cargo.lock"],
+        "java": ["pom.xml", "build.gradle", "gradle.build"],
+        "dotnet": ["*.csproj", "*.sln"],
+    }
+    _INDICATOR_NAMES, _INDICATOR_SUFFIXES = _index_indicators(PROJECT_INDICATORS)
+    
     @staticmethod
     def detect_project_type(path: str) -> Dict[str, Any]:
         """Detect project type and suggest optimal exclusions"""
-        indicators = {
-            "python": ["requirements.txt", "setup.py", "pyproject.toml", "Pipfile"],
-            "node": ["package.json", "yarn.lock", "package-lock.json"],
-            "react": ["package.json"],  # Check for react in deps
-            "vue": ["vue.config.js", "nuxt.config.js"],
-            "go": ["go.mod", "go.sum"],
-            "rust": ["Cargo.toml", "Cargo.lock"],
-            "java": ["pom.xml", "build.gradle", "gradle.build"],
-            "dotnet": ["*.csproj", "*.sln"],
-        }
+        # Indicator files nearly always sit at the repository root, so look there
+        # first and only walk the whole tree (e.g. for a monorepo) if nothing shows up
+        indicators = RepoAnalyzer.PROJECT_INDICATORS
+        found = set()
+        try:
+            with os.scandir(path) as it:
+                RepoAnalyzer._collect_indicators((entry for entry in it if not entry.is_dir()), found)
+        except OSError:
+            pass
+        if not found:
+            RepoAnalyzer._collect_indicators(_iter_files(path), found)
         
-        detected = []
-        for proj_type, files in indicators.items():
-            for file_pattern in files:
-                if any(Path(path).rglob(file_pattern)):
-                    detected.append(proj_type)
-                    break
+        detected = [proj_type for proj_type in indicators if proj_type in found]
         
         return {
             "types": detected,
@@ -137,9 +380,30 @@ class RepoAnalyzer:
             "suggested_exclusions": RepoAnalyzer._get_exclusions_for_type(detected)
         }
     
+    @staticmethod
+    def _collect_indicators(entries, found: Set[str]) -> None:
+        """Add the project types marked by the entries' names to found, stopping once all are seen"""
+        names = RepoAnalyzer._INDICATOR_NAMES
+        suffixes = RepoAnalyzer._INDICATOR_SUFFIXES
+        for entry in entries:
+            name = entry.name
+            if name in names:
+                found.update(names[name])
+            for suffix, proj_type in suffixes:
+                if name.endswith(suffix):
+                    found.add(proj_type)
+            if len(found) == len(RepoAnalyzer.PROJECT_INDICATORS):
+                return
+    
     @staticmethod
     def _get_exclusions_for_type(project_types: List[str]) -> List[str]:
         """Get recommended exclusions based on project type"""
+        # The result only depends on which types are present, so cache on their sorted set
+        return list(RepoAnalyzer._exclusions_for_types(tuple(sorted(set(project_types)))))
+    
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _exclusions_for_types(project_types: Tuple[str, ...]) -> Tuple[str, ...]:
         exclusions = set(ProjectConfig.DEFAULT_EXCLUSIONS)
         
         type_specific = {
@@ -155,97 +419,284 @@ class RepoAnalyzer:
             if proj_type in type_specific:
                 exclusions.update(type_specific[proj_type])
         
-        return sorted(list(exclusions))
+        return tuple(sorted(exclusions))
+    
+    @staticmethod
+    def count_file_types(path: str, config: Optional[ProjectConfig] = None) -> Tuple[int, Dict[str, int]]:
+        """Count files and their extensions, skipping the directories the converter excludes"""
+        prune = RepoToTextConverter(config)._dir_pruner(path)
+        # Interned so the handful of distinct extensions share one object each
+        file_types = Counter(
+            sys.intern(os.path.splitext(entry.name)[1].lower())
+            for entry in _iter_files(path, prune=prune)
+        )
+        total_files = sum(file_types.values())
+        # Files without an extension count towards the total only
+        del file_types['']
+        return total_files, file_types
 
 class RepoToTextConverter:
     """Main converter class with multiple output formats"""
     
+    # Per-file wrappers, formatted once per file with %
+    XML_CONTENT_OPEN = '<content full_path=%s>\n'
+    XML_CONTENT_CLOSE = '\n</content>\n\n'
+    SHOTGUN_CONTENT_OPEN = '*#*#*%s*#*#*begin*#*#*\n'
+    SHOTGUN_CONTENT_CLOSE = '\n*#*#*end*#*#*\n'
+    
     def __init__(self, config: Optional[ProjectConfig] = None):
         self.config = config or ProjectConfig()
+        self._gitignore_specs: Dict[str, Optional[pathspec.GitIgnoreSpec]] = {}
     
-    def _should_include_file(self, file_path: str) -> bool:
-        """Check if file should be included based on patterns"""
-        # Check exclusions
-        for pattern in self.config.exclude_patterns + self.config.DEFAULT_EXCLUSIONS:
-            if fnmatch.fnmatch(file_path, pattern) or pattern in file_path:
-                return False
+    def _load_gitignore(self, root_path: str) -> Optional[pathspec.GitIgnoreSpec]:
+        """Parse the repository's .gitignore once and reuse the compiled spec"""
+        if not self.config.gitignore_import:
+            return None
+        if root_path not in self._gitignore_specs:
+            try:
+                with open(os.path.join(root_path, '.gitignore'), 'r', encoding='utf-8', errors='ignore') as f:
+                    spec = pathspec.GitIgnoreSpec.from_lines(f)
+            except OSError:
+                spec = None
+            self._gitignore_specs[root_path] = spec
+        return self._gitignore_specs[root_path]
+    
+    def _load_dir_gitignore(self, root_path: str) -> Optional[pathspec.GitIgnoreSpec]:
+        """Return the gitignore spec if whole directories may be pruned on it, else None"""
+        spec = self._load_gitignore(root_path)
+        # A negation can re-include files below a directory the spec matches, so then
+        # directories are always descended and their files checked one by one
+        if spec is not None and any(pattern.include is False for pattern in spec.patterns):
+            return None
+        return spec
+    
+    def _is_dir_excluded(self, name: str, rel_path: str) -> bool:
+        """Check if a directory is excluded, so nothing below it needs to be visited"""
+        excluded_re, excluded_names, excluded_dir_names, _ = self.config.exclusion_matcher
+        if name in excluded_names or name in excluded_dir_names:
+            return True
+        if os.sep != '/':
+            rel_path = rel_path.replace(os.sep, '/')
+        return excluded_re.match(rel_path + '/') is not None
+    
+    def _dir_pruner(self, root_path: str) -> Callable[[os.DirEntry], bool]:
+        """Return an _iter_files prune callback that skips the directories _walk skips"""
+        root_len = len(os.path.join(root_path, ''))
+        dir_gitignore = self._load_dir_gitignore(root_path)
         
-        # Check if it's a binary file
-        mime_type, _ = mimetypes.guess_type(file_path)
-        if mime_type and not mime_type.startswith('text/'):
-            return False
+        def prune(entry: os.DirEntry) -> bool:
+            rel_path = entry.path[root_len:]
+            return (self._is_dir_excluded(entry.name, rel_path)
+                    or bool(dir_gitignore and dir_gitignore.match_file(rel_path + '/')))
         
-        # Check file size
+        return prune
+    
+    def _included_size(self, entry: os.DirEntry, rel_path: str, max_file_size: int,
+                       gitignore: Optional[pathspec.GitIgnoreSpec] = None) -> Optional[int]:
+        """Return the size of a scandir entry if it should be included, else None"""
+        # Only regular files are opened: a FIFO or device would block or never end.
+        # The type comes from the directory listing, so this costs no syscall.
+        if not entry.is_file() or not self._file_filter(rel_path):
+            return None
+        if gitignore and gitignore.match_file(rel_path):
+            return None
+        # Path checks come first, so excluded files never cost a stat() call
         try:
-            if os.path.getsize(file_path) > self.config.max_file_size:
+            size = entry.stat().st_size
+        except OSError:
+            return None
+        return size if size <= max_file_size else None
+    
+    @cached_property
+    def _file_filter(self) -> Callable[[str], bool]:
+        """Check a file's relative path against the exclusion patterns of this config"""
+        # Bound into a closure once, so the per-file check does no attribute lookups
+        excluded_re, excluded_names, excluded_dir_names, excluded_exts = self.config.exclusion_matcher
+        excluded_match = excluded_re.match
+        no_excluded_name = excluded_names.isdisjoint
+        no_excluded_dir = excluded_dir_names.isdisjoint
+        sep = os.sep if os.sep != '/' else None
+        
+        def include(file_path: str) -> bool:
+            if sep:
+                file_path = file_path.replace(sep, '/')
+            _, dot, ext = file_path.rpartition('.')
+            if dot and '/' not in ext and ext in excluded_exts:
                 return False
-        except:
-            return False
+            parts = file_path.split('/')
+            # Directory-only names never match the file's own name
+            return (no_excluded_name(parts) and no_excluded_dir(parts[:-1])
+                    and excluded_match(file_path) is None)
         
-        return True
+        return include
     
     def generate_xml_format(self, root_path: str) -> str:
         """Generate clean XML format output"""
-        lines = []
-        lines.append("<repo-to-text>")
-        lines.append(f"Directory: {os.path.basename(root_path)}")
-        lines.append("")
+        out = io.StringIO()
+        self.write_xml_to(root_path, out)
+        return out.getvalue()
+    
+    def write_xml_to(self, root_path: str, out) -> None:
+        """Stream the XML format to a text file-like object"""
+        out.write("<repo-to-text>\n")
+        out.write(f"Directory: {os.path.basename(root_path)}\n")
+        out.write("\n")
+        
+        # One walk yields both the directory structure and the files to read
+        tree = []
+        paths = []
+        rel_paths = []
+        for root, level, files in self._walk(root_path):
+            tree.append(f"{_indent(level)}{os.path.basename(root)}/\n")
+            sub_indent = _indent(level + 1)
+            tree.extend([f"{sub_indent}{file}\n" for file, _, _, _ in files])
+            paths.extend([(file_path, size) for _, file_path, _, size in files])
+            rel_paths.extend([rel_path for _, _, rel_path, _ in files])
         
         # Add directory structure
-        lines.append("<directory_structure>")
-        for root, dirs, files in os.walk(root_path):
-            level = root.replace(root_path, '').count(os.sep)
-            indent = ' ' * 2 * level
-            lines.append(f"{indent}{os.path.basename(root)}/")
-            sub_indent = ' ' * 2 * (level + 1)
-            for file in files:
-                rel_path = os.path.relpath(os.path.join(root, file), root_path)
-                if self._should_include_file(rel_path):
-                    lines.append(f"{sub_indent}{file}")
-        lines.append("</directory_structure>")
-        lines.append("")
-        
-        # Add file contents
-        for root, dirs, files in os.walk(root_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                rel_path = os.path.relpath(file_path, root_path)
-                
-                if self._should_include_file(rel_path):
-                    try:
-                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            content = f.read()
-                            lines.append(f'<content full_path="{rel_path}">')
-                            lines.append(content)
-                            lines.append('</content>')
-                            lines.append('')
-                    except Exception as e:
-                        lines.append(f'<!-- Error reading {rel_path}: {str(e)} -->')
-        
-        lines.append("</repo-to-text>")
-        return '\n'.join(lines)
+        out.write("<directory_structure>\n")
+        out.write(''.join(tree))
+        out.write("</directory_structure>\n")
+        out.write("\n")
+        
+        # Add file contents. This loop runs once per file, so its lookups are bound locally.
+        write = out.write
+        # Sinks that split their output, like ChunkedTextWriter, are told where files end
+        file_boundary = getattr(out, 'file_boundary', None)
+        open_template = self.XML_CONTENT_OPEN
+        close = self.XML_CONTENT_CLOSE
+        for rel_path, (content, error) in zip(rel_paths, self._read_files(paths)):
+            if content is not None:
+                # quoteattr keeps paths containing quotes or '&' well-formed
+                write(open_template % _xml_attr(rel_path))
+                write(content)
+                write(close)
+            elif error is not None:
+                write(f'<!-- Error reading {rel_path}: {str(error)} -->\n')
+            if file_boundary is not None:
+                file_boundary()
+        
+        out.write("</repo-to-text>")
     
     def generate_shotgun_format(self, root_path: str) -> str:
         """Generate Shotgun-compatible format"""
-        lines = []
-        
-        for root, dirs, files in os.walk(root_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                rel_path = os.path.relpath(file_path, root_path)
-                
-                if self._should_include_file(rel_path):
-                    try:
-                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            content = f.read()
-                            lines.append(f"*#*#*{rel_path}*#*#*begin*#*#*")
-                            lines.append(content)
-                            lines.append("*#*#*end*#*#*")
-                            lines.append("")
-                    except:
-                        continue
-        
-        return '\n'.join(lines)
+        out = io.StringIO()
+        self.write_shotgun_to(root_path, out)
+        return out.getvalue()
+    
+    def write_shotgun_to(self, root_path: str, out) -> None:
+        """Stream the Shotgun format to a text file-like object"""
+        paths, rel_paths = self._included_files(root_path)
+        
+        write = out.write
+        # Sinks that split their output, like ChunkedTextWriter, are told where files end
+        file_boundary = getattr(out, 'file_boundary', None)
+        open_template = self.SHOTGUN_CONTENT_OPEN
+        close = self.SHOTGUN_CONTENT_CLOSE
+        separator = ""
+        for rel_path, (content, error) in zip(rel_paths, self._read_files(paths)):
+            if content is not None:
+                write(separator)
+                write(open_template % rel_path)
+                write(content)
+                write(close)
+                separator = "\n"
+                if file_boundary is not None:
+                    file_boundary()
+    
+    def write_shotgun_to_fd(self, root_path: str, fd: int) -> None:
+        """Stream the Shotgun format as UTF-8 to a file descriptor, one os.writev() per file"""
+        open_template = self.SHOTGUN_CONTENT_OPEN.encode()
+        close = self.SHOTGUN_CONTENT_CLOSE.encode()
+        paths, rel_paths = self._included_files(root_path)
+        
+        separator = b""
+        for rel_path, (content, error) in zip(rel_paths, self._read_files(paths, _read_file_bytes)):
+            if content is not None:
+                # surrogateescape gives back the original bytes of undecodable file names
+                header = open_template % rel_path.encode('utf-8', 'surrogateescape')
+                self._write_all(fd, [separator, header, content, close])
+                separator = b"\n"
+    
+    @staticmethod
+    def _write_all(fd: int, buffers: List[bytes]) -> None:
+        """Write buffers to fd in order, with a single writev() call in the usual case"""
+        total = sum(map(len, buffers))
+        if hasattr(os, 'writev'):
+            written = os.writev(fd, buffers)
+            if written == total:
+                return
+            data = memoryview(b''.join(buffers))[written:]
+        else:
+            data = memoryview(b''.join(buffers))
+        # Pipes and sockets may accept less than asked for
+        while data:
+            data = data[os.write(fd, data):]
+    
+    def _included_files(self, root_path: str) -> Tuple[List[Tuple[str, int]], List[str]]:
+        """List the (path, size) pairs and relative paths of all included files, in walk order"""
+        paths = []
+        rel_paths = []
+        for _, _, files in self._walk(root_path):
+            paths.extend([(file_path, size) for _, file_path, _, size in files])
+            rel_paths.extend([rel_path for _, _, rel_path, _ in files])
+        return paths, rel_paths
+    
+    def _walk(self, root_path: str):
+        """Yield (directory, depth, [(name, path, relative path, size), ...]) top-down, like os.walk"""
+        root_len = len(os.path.join(root_path, ''))
+        gitignore = self._load_gitignore(root_path)
+        dir_gitignore = self._load_dir_gitignore(root_path)
+        max_file_size = self.config.max_file_size
+        stack = [(root_path, 0)]
+        while stack:
+            dir_path, depth = stack.pop()
+            # Every path below starts with the root joined to '', so slicing gives the relative path
+            prefix = os.path.join(dir_path, '')
+            files = []
+            subdirs = []
+            try:
+                # Scanning through a descriptor makes the per-file stat() calls relative to it
+                fd = os.open(dir_path, os.O_RDONLY | os.O_DIRECTORY) if _SCANDIR_FD else None
+                try:
+                    with os.scandir(dir_path if fd is None else fd) as it:
+                        for entry in it:
+                            path = prefix + entry.name
+                            rel_path = path[root_len:]
+                            if entry.is_dir():
+                                # Like os.walk, don't follow symlinked directories
+                                if (not entry.is_symlink()
+                                        and not self._is_dir_excluded(entry.name, rel_path)
+                                        and not (dir_gitignore and dir_gitignore.match_file(rel_path + '/'))):
+                                    subdirs.append(path)
+                            else:
+                                size = self._included_size(entry, rel_path, max_file_size, gitignore)
+                                if size is not None:
+                                    files.append((entry.name, path, rel_path, size))
+                finally:
+                    if fd is not None:
+                        os.close(fd)
+            except OSError:
+                continue
+            yield dir_path, depth, files
+            depth += 1
+            stack.extend((subdir, depth) for subdir in reversed(subdirs))
+    
+    @staticmethod
+    def _read_files(paths: List[Tuple[str, int]], reader: Callable = _read_file):
+        """Read (path, size) pairs concurrently, yielding (content, error) pairs in input order"""
+        if len(paths) <= SERIAL_READ_LIMIT:
+            for file_path, size in paths:
+                yield reader(file_path, size)
+            return
+        with ThreadPoolExecutor(max_workers=min(READ_WORKERS, len(paths))) as executor:
+            pending = deque()
+            for file_path, size in paths:
+                pending.append(executor.submit(reader, file_path, size))
+                if len(pending) >= READ_AHEAD:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
 
 class GeminiTaskGenerator:
     """Generates implementation tasks using Gemini's context understanding"""
@@ -290,17 +741,45 @@ Each directive should be actionable and specific.
 Include exact file paths and code snippets.
 """
 
+    # The template around the project context, which is spliced in without formatting
+    _TASK_PROMPT_HEAD, _TASK_PROMPT_TAIL = TASK_PROMPT_TEMPLATE.split('{project_context}')
+
     @staticmethod
     def create_task_prompt(project_context: str, project_analysis: Dict, 
                           requirements: str, task_type: str, complexity: str) -> str:
         """Create prompt for Gemini to generate implementation tasks"""
-        return GeminiTaskGenerator.TASK_PROMPT_TEMPLATE.format(
-            project_context=project_context,
-            project_analysis=json.dumps(project_analysis, indent=2),
-            requirements=requirements,
-            task_type=task_type,
-            complexity=complexity
-        )
+        return ''.join(GeminiTaskGenerator.task_prompt_parts(
+            project_context, project_analysis, requirements, task_type, complexity
+        ))
+    
+    @staticmethod
+    def task_prompt_parts(project_context: str, project_analysis: Dict, 
+                          requirements: str, task_type: str, complexity: str) -> List[str]:
+        """Create the task prompt as [head, project_context, tail]"""
+        # Callers join the parts into their own response, copying the context only once
+        return [
+            GeminiTaskGenerator._TASK_PROMPT_HEAD,
+            project_context,
+            GeminiTaskGenerator._TASK_PROMPT_TAIL.format(
+                project_analysis=json.dumps(project_analysis, indent=2),
+                requirements=requirements,
+                task_type=task_type,
+                complexity=complexity
+            ),
+        ]
+    
+    # A '#' line that opens a section. Alternatives are tried in priority order, and
+    # the empty named group that matches tells which section the header opens.
+    SECTION_HEADER_RE = re.compile(r'''
+        ^\#(?:
+            (?=.*overview)(?P<overview>)
+          | (?=.*architecture)(?P<architecture_changes>)
+          | (?=.*implementation)(?=.*step)(?P<implementation_steps>)
+          | (?=.*file)(?=.*modif)(?P<file_modifications>)
+          | (?=.*code)(?=.*example)(?P<code_examples>)
+          | (?=.*test)(?P<testing_strategy>)
+          | (?=.*issue)(?P<potential_issues>)
+        ).*''', re.IGNORECASE | re.MULTILINE | re.VERBOSE)
     
     @staticmethod
     def parse_gemini_response(response: str) -> Dict[str, Any]:
@@ -315,44 +794,32 @@ Include exact file paths and code snippets.
             "potential_issues": []
         }
         
-        current_section = None
-        current_content = []
-        
-        for line in response.split('\n'):
-            # Detect section headers
-            lower_line = line.lower().strip()
-            if "overview" in lower_line and line.startswith("#"):
-                current_section = "overview"
-                current_content = []
-            elif "architecture" in lower_line and line.startswith("#"):
-                current_section = "architecture_changes"
-                current_content = []
-            elif "implementation" in lower_line and "step" in lower_line and line.startswith("#"):
-                current_section = "implementation_steps"
-                current_content = []
-            elif "file" in lower_line and "modif" in lower_line and line.startswith("#"):
-                current_section = "file_modifications"
-                current_content = []
-            elif "code" in lower_line and "example" in lower_line and line.startswith("#"):
-                current_section = "code_examples"
-                current_content = []
-            elif "test" in lower_line and line.startswith("#"):
-                current_section = "testing_strategy"
-                current_content = []
-            elif "issue" in lower_line and line.startswith("#"):
-                current_section = "potential_issues"
-                current_content = []
-            elif current_section:
-                current_content.append(line)
-                
-                # Update section content
-                if current_section in ["overview", "testing_strategy"]:
-                    sections[current_section] = '\n'.join(current_content).strip()
-                else:
-                    sections[current_section] = current_content
+        # Each header names its section; text up to the next section header is its content
+        headers = list(GeminiTaskGenerator.SECTION_HEADER_RE.finditer(response))
+        for i, header in enumerate(headers):
+            start = header.end() + 1
+            end = headers[i + 1].start() - 1 if i + 1 < len(headers) else len(response)
+            # A header followed directly by another one, or ending the response, leaves
+            # the section as it was
+            if start > end:
+                continue
+            section = header.lastgroup
+            content = response[start:end]
+            if section in ("overview", "testing_strategy"):
+                sections[section] = content.strip()
+            else:
+                sections[section] = content.split('\n')
         
         return sections
 
+    @staticmethod
+    def _nonblank(items: List[str]):
+        """Yield the stripped items that are not blank, as both IDE formatters list them"""
+        for item in items:
+            item = item.strip()
+            if item:
+                yield item
+
     @staticmethod
     def format_for_cursor(tasks: Dict[str, Any], project_context: str = "") -> str:
         """Format tasks as Cursor/Windsurf directives"""
@@ -372,9 +839,8 @@ Include exact file paths and code snippets.
         # Architecture changes
         if tasks.get("architecture_changes"):
             output.append("## 🏗️ ARCHITECTURE CHANGES")
-            for change in tasks["architecture_changes"]:
-                if change.strip():
-                    output.append(f"- {change.strip()}")
+            for change in GeminiTaskGenerator._nonblank(tasks["architecture_changes"]):
+                output.append(f"- {change}")
             output.append("")
         
         # Implementation steps
@@ -389,17 +855,14 @@ Include exact file paths and code snippets.
         # File modifications
         if tasks.get("file_modifications"):
             output.append("## 📁 FILE MODIFICATIONS")
-            for mod in tasks["file_modifications"]:
-                if mod.strip():
-                    output.append(f"\n{mod.strip()}")
+            for mod in GeminiTaskGenerator._nonblank(tasks["file_modifications"]):
+                output.append(f"\n{mod}")
             output.append("")
         
         # Code examples
         if tasks.get("code_examples"):
             output.append("## 💻 CODE EXAMPLES")
-            for example in tasks["code_examples"]:
-                if example.strip():
-                    output.append(example.strip())
+            output.extend(GeminiTaskGenerator._nonblank(tasks["code_examples"]))
             output.append("")
         
         # Testing
@@ -434,30 +897,27 @@ Include exact file paths and code snippets.
         
         # Convert architecture changes to tasks
         if tasks.get("architecture_changes"):
-            for change in tasks["architecture_changes"]:
-                if change.strip():
-                    task_count += 1
-                    output.append(f"### Task {task_count}: Architecture - {change.strip()}")
-                    output.append("**Priority**: High")
-                    output.append("**Status**: ⏳ Pending")
-                    output.append("")
+            for change in GeminiTaskGenerator._nonblank(tasks["architecture_changes"]):
+                task_count += 1
+                output.append(f"### Task {task_count}: Architecture - {change}")
+                output.append("**Priority**: High")
+                output.append("**Status**: ⏳ Pending")
+                output.append("")
         
         # Convert implementation steps to tasks
         if tasks.get("implementation_steps"):
-            for step in tasks["implementation_steps"]:
-                if step.strip():
-                    task_count += 1
-                    # Extract first line as task title
-                    lines = step.strip().split('\n')
-                    title = lines[0].strip('- ').strip()
-                    output.append(f"### Task {task_count}: {title}")
-                    output.append("**Priority**: Medium")
-                    output.append("**Status**: ⏳ Pending")
-                    if len(lines) > 1:
-                        output.append("**Details**:")
-                        for line in lines[1:]:
-                            output.append(line)
-                    output.append("")
+            for step in GeminiTaskGenerator._nonblank(tasks["implementation_steps"]):
+                task_count += 1
+                # Extract first line as task title
+                lines = step.split('\n')
+                title = lines[0].strip('- ').strip()
+                output.append(f"### Task {task_count}: {title}")
+                output.append("**Priority**: Medium")
+                output.append("**Status**: ⏳ Pending")
+                if len(lines) > 1:
+                    output.append("**Details**:")
+                    output.extend(lines[1:])
+                output.append("")
         
         # Add testing as final task
         if tasks.get("testing_strategy"):
@@ -474,6 +934,120 @@ Include exact file paths and code snippets.
         
         return '\n'.join(output)
 
+class ChunkedTextWriter:
+    """Text sink that splits its output into chunks of roughly chunk_size characters"""
+    # Chunks are only cut on file_boundary(), which the converter calls between files
+    
+    def __init__(self, chunk_size: int = TEXT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.chunks: List[str] = []
+        self._parts: List[str] = []
+        self._size = 0
+    
+    def write(self, text: str) -> None:
+        self._parts.append(text)
+        self._size += len(text)
+    
+    def file_boundary(self) -> None:
+        if self._size >= self.chunk_size:
+            self._cut()
+    
+    def getchunks(self) -> List[str]:
+        """Return all chunks, including any pending partial one"""
+        self._cut()
+        return self.chunks or [""]
+    
+    def _cut(self) -> None:
+        if self._parts:
+            self.chunks.append(''.join(self._parts))
+            self._parts = []
+            self._size = 0
+
+class ResultCache:
+    """Thread-safe LRU cache of generated text, bounded by the characters it holds"""
+    
+    def __init__(self, max_chars: int = RESULT_CACHE_CHARS):
+        self.max_chars = max_chars
+        self._entries = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+    
+    def get(self, key: Any) -> Optional[Any]:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+    
+    def put(self, key: Any, value: Any) -> None:
+        chars = self._chars_of(value)
+        with self._lock:
+            if key in self._entries:
+                self._chars -= self._entries.pop(key)[1]
+            # A result larger than the whole cache would only evict everything else
+            if chars > self.max_chars:
+                return
+            self._entries[key] = (value, chars)
+            self._chars += chars
+            while self._chars > self.max_chars:
+                self._chars -= self._entries.popitem(last=False)[1][1]
+    
+    @staticmethod
+    def _chars_of(value: Any) -> int:
+        """Count the characters of a string, or of the strings in a list or tuple"""
+        if isinstance(value, str):
+            return len(value)
+        return sum(len(item) for item in value if isinstance(item, str))
+
+# Generated repo contexts, keyed on the request and a fingerprint of the tree
+repo_context_cache = ResultCache()
+
+def generate_repo_context(path: str, format_type: str = "xml",
+                          exclusions: Optional[List[str]] = None,
+                          root_stat: Optional[os.stat_result] = None) -> List[str]:
+    """Convert a repository to text chunks, reusing the previous result if nothing changed"""
+    exclusions = exclusions or []
+    converter = RepoToTextConverter(ProjectConfig(exclude_patterns=list(exclusions)))
+    key = (os.path.abspath(path), format_type, tuple(sorted(exclusions)),
+           _tree_fingerprint(path, root_stat, converter._dir_pruner(path)))
+    chunks = repo_context_cache.get(key)
+    if chunks is None:
+        out = ChunkedTextWriter()
+        
+        if format_type == "xml":
+            converter.write_xml_to(path, out)
+        elif format_type == "shotgun":
+            converter.write_shotgun_to(path, out)
+        else:
+            converter.write_xml_to(path, out)  # Default to XML
+        chunks = out.getchunks()
+        repo_context_cache.put(key, chunks)
+    return chunks
+
+def compress_chunks(chunks: List[str]) -> str:
+    """Gzip and base64-encode text chunks into a ```gzip+base64 fenced block"""
+    # wbits=31 writes a gzip header, and the chunks are fed through without joining them
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    data = b''.join([compressor.compress(chunk.encode('utf-8')) for chunk in chunks])
+    data += compressor.flush()
+    return "```gzip+base64\n" + base64.encodebytes(data).decode('ascii') + "```"
+
+# XML contexts and project analyses for the prompt tools, keyed on a fingerprint of the tree
+project_context_cache = ResultCache()
+
+def generate_project_context(path: str, root_stat: Optional[os.stat_result] = None) -> Tuple[str, Dict[str, Any]]:
+    """Return the XML context and detected project type of path, reused until the tree changes"""
+    converter = RepoToTextConverter(ProjectConfig())
+    key = (os.path.abspath(path), _tree_fingerprint(path, root_stat, converter._dir_pruner(path)))
+    result = project_context_cache.get(key)
+    if result is None:
+        # The two are independent, so detection runs alongside the conversion
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            analysis = executor.submit(RepoAnalyzer.detect_project_type, path)
+            result = (converter.generate_xml_format(path), analysis.result())
+        project_context_cache.put(key, result)
+    return result
+
 # Initialize the MCP server
 server = Server("repo-to-text")
 
@@ -517,6 +1091,11 @@ async def list_tools() -> List[Tool]:
                         "items": {"type": "string"},
                         "default": [],
                         "description": "Additional patterns to exclude"
+                    },
+                    "compress": {
+                        "type": "boolean",
+                        "default": False,
+                        "description": "Return the output gzip-compressed and base64-encoded in a ```gzip+base64 block"
                     }
                 },
                 "required": ["path"]
@@ -657,134 +1236,152 @@ async def list_tools() -> List[Tool]:
         )
     ]
 
-@server.call_tool()
-async def call_tool(name: str, arguments: Dict[str, Any]) -> List[Union[TextContent, ImageContent, EmbeddedResource]]:
-    """Handle tool calls"""
-    
-    if name == "analyze_project":
-        path = arguments["path"]
-        
-        if not os.path.exists(path):
-            return [TextContent(type="text", text=f"Error: Path '{path}' does not exist")]
-        
-        try:
-            analyzer = RepoAnalyzer()
-            project_info = analyzer.detect_project_type(path)
-            
-            # Count files
-            total_files = 0
-            file_types = {}
-            for root, dirs, files in os.walk(path):
-                for file in files:
-                    total_files += 1
-                    ext = os.path.splitext(file)[1].lower()
-                    if ext:
-                        file_types[ext] = file_types.get(ext, 0) + 1
-            
-            result = f"""# Project Analysis
+# Result templates for the lightweight tools, parsed once instead of per call
+ANALYSIS_TEMPLATE = """# Project Analysis
 
 ## Overview
-- **Total Files**: {total_files:,}
-- **Root Path**: {path}
-- **Detected Type(s)**: {', '.join(project_info['types']) or 'Generic'}
+- **Total Files**: %(total_files)s
+- **Root Path**: %(path)s
+- **Detected Type(s)**: %(types)s
 
 ## File Types Distribution
-""" + '\n'.join([f"- **{ext}**: {count} files" for ext, count in sorted(file_types.items(), key=lambda x: x[1], reverse=True)[:10]])
+%(file_types)s
+
+## Suggested Exclusions
+%(exclusions)s"""
+FILE_TYPE_ROW = "- **%s**: %d files"
+EXCLUSION_ROW = "- `%s`\n"
+
+TOKEN_ESTIMATE_TEMPLATE = """# Token Estimation
+
+**Text Length**: %(length)s characters
+**Estimated Tokens** (%(provider)s): %(tokens)s
+
+## Context Limit Comparison
+%(limits)s"""
+CONTEXT_LIMIT_ROW = "- **%s**: %s tokens | %.1f%% used\n"
 
-            result += f"\n\n## Suggested Exclusions\n"
-            for excl in project_info['suggested_exclusions'][:15]:
-                result += f"- `{excl}`\n"
-            
-            return [TextContent(type="text", text=result)]
-            
-        except Exception as e:
-            return [TextContent(type="text", text=f"Error analyzing project: {str(e)}")]
+# What a tool call returns to the client
+ToolResult = List[Union[TextContent, ImageContent, EmbeddedResource]]
+
+async def _handle_analyze_project(arguments: Dict[str, Any]) -> ToolResult:
+    """Analyze a project's structure and suggest exclusions"""
+    path = arguments["path"]
+    
+    if not os.path.exists(path):
+        return [TextContent(type="text", text=f"Error: Path '{path}' does not exist")]
     
-    elif name == "generate_repo_context":
-        path = arguments["path"]
-        format_type = arguments.get("format", "xml")
-        exclusions = arguments.get("exclusions", [])
+    try:
+        analyzer = RepoAnalyzer()
+        # Directory walks block, so keep them off the event loop
+        project_info = await asyncio.to_thread(analyzer.detect_project_type, path)
         
-        if not os.path.exists(path):
-            return [TextContent(type="text", text=f"Error: Path '{path}' does not exist")]
+        # Count files
+        total_files, file_types = await asyncio.to_thread(analyzer.count_file_types, path)
         
-        try:
-            config = ProjectConfig()
-            config.exclude_patterns.extend(exclusions)
-            converter = RepoToTextConverter(config)
-            
-            if format_type == "xml":
-                result = converter.generate_xml_format(path)
-            elif format_type == "shotgun":
-                result = converter.generate_shotgun_format(path)
-            else:
-                result = converter.generate_xml_format(path)  # Default to XML
-            
-            return [TextContent(type="text", text=result)]
-            
-        except Exception as e:
-            return [TextContent(type="text", text=f"Error generating repo context: {str(e)}")]
+        top_types = heapq.nlargest(10, file_types.items(), key=operator.itemgetter(1))
+        result = ANALYSIS_TEMPLATE % {
+            "total_files": format(total_files, ","),
+            "path": path,
+            "types": ', '.join(project_info['types']) or 'Generic',
+            "file_types": '\n'.join(map(FILE_TYPE_ROW.__mod__, top_types)),
+            "exclusions": ''.join(map(EXCLUSION_ROW.__mod__, project_info['suggested_exclusions'][:15])),
+        }
+        
+        return [TextContent(type="text", text=result)]
+        
+    except Exception as e:
+        return [TextContent(type="text", text=f"Error analyzing project: {str(e)}")]
+
+async def _handle_generate_repo_context(arguments: Dict[str, Any]) -> ToolResult:
+    """Convert a repository to LLM-friendly text"""
+    path = arguments["path"]
+    format_type = arguments.get("format", "xml")
+    exclusions = arguments.get("exclusions", [])
+    compress = arguments.get("compress", False)
     
-    elif name == "estimate_tokens":
-        text = arguments["text"]
-        provider = arguments.get("provider", "generic")
+    # The stat result doubles as the existence check and the fingerprint's root entry
+    try:
+        root_stat = os.stat(path)
+    except OSError:
+        return [TextContent(type="text", text=f"Error: Path '{path}' does not exist")]
+    
+    try:
+        chunks = await asyncio.to_thread(generate_repo_context, path, format_type, exclusions, root_stat)
+        if compress:
+            text = await asyncio.to_thread(compress_chunks, chunks)
+            return [TextContent(type="text", text=text)]
         
-        try:
-            tokens = TokenEstimator.estimate_tokens(text, provider)
-            limits = TokenEstimator.get_context_limits()
-            
-            result = f"""# Token Estimation
+        # Large repos come back as several blocks rather than one giant string
+        return [TextContent(type="text", text=chunk) for chunk in chunks]
+        
+    except Exception as e:
+        return [TextContent(type="text", text=f"Error generating repo context: {str(e)}")]
 
-**Text Length**: {len(text):,} characters
-**Estimated Tokens** ({provider}): {tokens:,}
+async def _handle_estimate_tokens(arguments: Dict[str, Any]) -> ToolResult:
+    """Estimate the token count of a text for each provider"""
+    text = arguments["text"]
+    provider = arguments.get("provider", "generic")
+    
+    try:
+        tokens = TokenEstimator.estimate_tokens(text, provider)
+        limits = TokenEstimator.get_context_limits()
+        
+        result = TOKEN_ESTIMATE_TEMPLATE % {
+            "length": format(len(text), ","),
+            "provider": provider,
+            "tokens": format(tokens, ","),
+            "limits": ''.join([
+                CONTEXT_LIMIT_ROW % (model, format(limit, ","), (tokens/limit)*100)
+                for model, limit in limits.items()
+            ]),
+        }
+        
+        return [TextContent(type="text", text=result)]
+        
+    except Exception as e:
+        return [TextContent(type="text", text=f"Error estimating tokens: {str(e)}")]
 
-## Context Limit Comparison
-"""
-            for model, limit in limits.items():
-                percentage = (tokens/limit)*100
-                result += f"- **{model}**: {limit:,} tokens | {percentage:.1f}% used\n"
-            
-            return [TextContent(type="text", text=result)]
-            
-        except Exception as e:
-            return [TextContent(type="text", text=f"Error estimating tokens: {str(e)}")]
-    
-    elif name == "generate_implementation_tasks":
-        project_path = arguments["project_path"]
-        requirements = arguments["requirements"]
-        task_type = arguments.get("task_type", "feature")
-        target_ide = arguments.get("target_ide", "cursor")
-        complexity = arguments.get("complexity", "moderate")
-        
-        if not os.path.exists(project_path):
-            return [TextContent(type="text", text=f"Error: Project path '{project_path}' does not exist")]
+async def _handle_generate_implementation_tasks(arguments: Dict[str, Any]) -> ToolResult:
+    """Build the Gemini prompt for generating implementation tasks"""
+    project_path = arguments["project_path"]
+    requirements = arguments["requirements"]
+    task_type = arguments.get("task_type", "feature")
+    target_ide = arguments.get("target_ide", "cursor")
+    complexity = arguments.get("complexity", "moderate")
+    
+    try:
+        root_stat = os.stat(project_path)
+    except OSError:
+        return [TextContent(type="text", text=f"Error: Project path '{project_path}' does not exist")]
+    
+    try:
+        # Generate project context and analyze the project
+        project_context, project_analysis = await asyncio.to_thread(
+            generate_project_context, project_path, root_stat
+        )
+        context_tokens = TokenEstimator.estimate_tokens(project_context)
+        types_str = ', '.join(project_analysis['types'])
         
-        try:
-            # Generate project context
-            config = ProjectConfig()
-            converter = RepoToTextConverter(config)
-            project_context = converter.generate_xml_format(project_path)
-            
-            # Analyze project
-            analyzer = RepoAnalyzer()
-            project_analysis = analyzer.detect_project_type(project_path)
-            
-            # Create Gemini prompt
-            task_prompt = GeminiTaskGenerator.create_task_prompt(
-                project_context=project_context,
-                project_analysis=project_analysis,
-                requirements=requirements,
-                task_type=task_type,
-                complexity=complexity
-            )
-            
-            result = f"""# Generated Implementation Task Prompt
+        # Create Gemini prompt, keeping the context as a separate part so that
+        # the response below copies it only once
+        task_prompt = GeminiTaskGenerator.task_prompt_parts(
+            project_context=project_context,
+            project_analysis=project_analysis,
+            requirements=requirements,
+            task_type=task_type,
+            complexity=complexity
+        )
+        
+        parts = ["""# Generated Implementation Task Prompt
 
 ## Instructions for Gemini 2.5 Pro
 Copy this prompt to Gemini 2.5 Pro to generate complete implementation directives:
 
 ```
-{task_prompt}
+"""]
+        parts += task_prompt
+        parts.append(f"""
 ```
 
 ## Next Steps:
@@ -793,61 +1390,65 @@ Copy this prompt to Gemini 2.5 Pro to generate complete implementation directive
 3. The parsed result will be formatted for {target_ide}
 
 ## Project Stats:
-- Context size: ~{TokenEstimator.estimate_tokens(project_context):,} tokens
-- Project type: {', '.join(project_analysis['types'])}
+- Context size: ~{context_tokens:,} tokens
+- Project type: {types_str}
 - Task complexity: {complexity}
-"""
-            
-            return [TextContent(type="text", text=result)]
-            
-        except Exception as e:
-            return [TextContent(type="text", text=f"Error generating implementation tasks: {str(e)}")]
+""")
+        
+        return [TextContent(type="text", text=''.join(parts))]
+        
+    except Exception as e:
+        return [TextContent(type="text", text=f"Error generating implementation tasks: {str(e)}")]
+
+async def _handle_parse_gemini_response(arguments: Dict[str, Any]) -> ToolResult:
+    """Parse a Gemini response into directives for the target IDE"""
+    gemini_response = arguments["gemini_response"]
+    target_ide = arguments.get("target_ide", "cursor")
+    create_tasks = arguments.get("create_tasks", True)
     
-    elif name == "parse_gemini_response":
-        gemini_response = arguments["gemini_response"]
-        target_ide = arguments.get("target_ide", "cursor")
-        create_tasks = arguments.get("create_tasks", True)
+    try:
+        # Parse the response
+        tasks = GeminiTaskGenerator.parse_gemini_response(gemini_response)
         
-        try:
-            # Parse the response
-            tasks = GeminiTaskGenerator.parse_gemini_response(gemini_response)
-            
-            # Format based on target IDE
-            if target_ide in ["cursor", "windsurf"]:
-                formatted = GeminiTaskGenerator.format_for_cursor(tasks)
-            elif target_ide == "claude-desktop" and create_tasks:
-                formatted = GeminiTaskGenerator.format_for_claude_desktop(tasks)
-            else:
-                # Generic format
-                formatted = json.dumps(tasks, indent=2)
-            
-            result = f"""# Parsed Implementation Directives
+        # Format based on target IDE
+        if target_ide in ["cursor", "windsurf"]:
+            formatted = GeminiTaskGenerator.format_for_cursor(tasks)
+        elif target_ide == "claude-desktop" and create_tasks:
+            formatted = GeminiTaskGenerator.format_for_claude_desktop(tasks)
+        else:
+            # Generic format
+            formatted = _json_dumps_indented(tasks)
+        
+        result = f"""# Parsed Implementation Directives
 
 ## Target IDE: {target_ide}
-## Tasks Found: {sum(1 for v in tasks.values() if v)}
+## Tasks Found: {sum(map(bool, tasks.values()))}
 
 {formatted}
 """
-            
-            return [TextContent(type="text", text=result)]
-            
-        except Exception as e:
-            return [TextContent(type="text", text=f"Error parsing Gemini response: {str(e)}")]
-    
-    elif name == "generate_implementation_plan":
-        project_path = arguments["project_path"]
-        requirements = arguments["requirements"]
-        target_ide = arguments.get("target_ide", "cursor")
-        include_context = arguments.get("include_context", True)
         
-        if not os.path.exists(project_path):
-            return [TextContent(type="text", text=f"Error: Project path '{project_path}' does not exist")]
+        return [TextContent(type="text", text=result)]
         
-        try:
-            # This is the complete Shotgun workflow
-            result = f"""# 🚀 SHOTGUN-STYLE IMPLEMENTATION PLAN GENERATOR
+    except Exception as e:
+        return [TextContent(type="text", text=f"Error parsing Gemini response: {str(e)}")]
 
-## Project: {os.path.basename(project_path)}
+async def _handle_generate_implementation_plan(arguments: Dict[str, Any]) -> ToolResult:
+    """Run the full Shotgun workflow up to the Gemini prompt"""
+    project_path = arguments["project_path"]
+    requirements = arguments["requirements"]
+    target_ide = arguments.get("target_ide", "cursor")
+    include_context = arguments.get("include_context", True)
+    
+    try:
+        root_stat = os.stat(project_path)
+    except OSError:
+        return [TextContent(type="text", text=f"Error: Project path '{project_path}' does not exist")]
+    
+    try:
+        # This is the complete Shotgun workflow
+        parts = [f"""# 🚀 SHOTGUN-STYLE IMPLEMENTATION PLAN GENERATOR
+
+## Project: {os.path.basename(project_path.rstrip('/' + os.sep))}
 ## Target IDE: {target_ide}
 
 ---
@@ -856,33 +1457,33 @@ Copy this prompt to Gemini 2.5 Pro to generate complete implementation directive
 
 ### Step 1: Generate Project Context
 First, let me analyze your project...
-"""
-            
-            # Generate context
-            config = ProjectConfig()
-            converter = RepoToTextConverter(config)
-            project_context = converter.generate_xml_format(project_path)
-            
-            # Analyze project
-            analyzer = RepoAnalyzer()
-            project_analysis = analyzer.detect_project_type(project_path)
-            
-            result += f"""
+"""]
+        
+        # Generate context and analyze the project
+        project_context, project_analysis = await asyncio.to_thread(
+            generate_project_context, project_path, root_stat
+        )
+        context_tokens = TokenEstimator.estimate_tokens(project_context)
+        types_str = ', '.join(project_analysis['types'])
+        
+        parts.append(f"""
 ✅ Project analyzed!
-- Type: {', '.join(project_analysis['types'])}
-- Context size: ~{TokenEstimator.estimate_tokens(project_context):,} tokens
+- Type: {types_str}
+- Context size: ~{context_tokens:,} tokens
 
 ### Step 2: Gemini Prompt
 Copy this complete prompt to Gemini 2.5 Pro:
 
 ```
-{GeminiTaskGenerator.create_task_prompt(
-    project_context=project_context if include_context else "[Project context excluded for brevity]",
-    project_analysis=project_analysis,
-    requirements=requirements,
-    task_type="feature",
-    complexity="moderate"
-)}
+""")
+        parts += GeminiTaskGenerator.task_prompt_parts(
+            project_context=project_context if include_context else "[Project context excluded for brevity]",
+            project_analysis=project_analysis,
+            requirements=requirements,
+            task_type="feature",
+            complexity="moderate"
+        )
+        parts.append(f"""
 ```
 
 ### Step 3: Parse Response
@@ -899,22 +1500,39 @@ The parsed directives will be formatted specifically for {target_ide}
 
 ## 🎯 Expected Output
 You'll get step-by-step implementation directives optimized for {target_ide}
-"""
-            
-            return [TextContent(type="text", text=result)]
-            
-        except Exception as e:
-            return [TextContent(type="text", text=f"Error generating implementation plan: {str(e)}")]
-    
-    elif name == "apply_patch":
-        patch_content = arguments["patch_content"]
-        target_path = arguments["target_path"]
-        dry_run = arguments.get("dry_run", True)
+""")
+        
+        return [TextContent(type="text", text=''.join(parts))]
         
-        return [TextContent(type="text", text=f"Patch application not yet implemented. Use dry_run=True to preview.")]
+    except Exception as e:
+        return [TextContent(type="text", text=f"Error generating implementation plan: {str(e)}")]
+
+async def _handle_apply_patch(arguments: Dict[str, Any]) -> ToolResult:
+    """Apply a patch to the codebase (not yet implemented)"""
+    patch_content = arguments["patch_content"]
+    target_path = arguments["target_path"]
+    dry_run = arguments.get("dry_run", True)
     
-    else:
+    return [TextContent(type="text", text=f"Patch application not yet implemented. Use dry_run=True to preview.")]
+
+# Tool name -> handler, so dispatching a call is a single dict lookup
+TOOL_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Awaitable[ToolResult]]] = {
+    "analyze_project": _handle_analyze_project,
+    "generate_repo_context": _handle_generate_repo_context,
+    "estimate_tokens": _handle_estimate_tokens,
+    "generate_implementation_tasks": _handle_generate_implementation_tasks,
+    "parse_gemini_response": _handle_parse_gemini_response,
+    "generate_implementation_plan": _handle_generate_implementation_plan,
+    "apply_patch": _handle_apply_patch,
+}
+
+@server.call_tool()
+async def call_tool(name: str, arguments: Dict[str, Any]) -> ToolResult:
+    """Handle tool calls"""
+    handler = TOOL_HANDLERS.get(name)
+    if handler is None:
         return [TextContent(type="text", text=f"Unknown tool: {name}")]
+    return await handler(arguments)
 
 async def main():
     # Run the server using stdin/stdout streams
@@ -933,4 +1551,10 @@ async def main():
         )
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop  # Optional faster event loop, installed with the "fast" extra
+    except ImportError:
+        uvloop = None
+    # uvloop.run() only exists from uvloop 0.18 on
+    run = getattr(uvloop, "run", None) or asyncio.run
+    run(main())
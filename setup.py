@@ -22,14 +22,15 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.7",
-        "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
         "Programming Language :: Python :: 3.11",
     ],
-    python_requires=">=3.7",
+    python_requires=">=3.9",
     install_requires=requirements,
+    extras_require={
+        "fast": ["orjson", "uvloop>=0.18; sys_platform != 'win32'"],
+    },
     entry_points={
         "console_scripts": [
             "repo-to-text-mcp=repo_to_text_mcp_server:main",
@@ -0,0 +1,278 @@
+import unittest
+import tempfile
+import shutil
+import os
+import re
+import threading
+from unittest import mock
+
+from repo_to_text_mcp_server import (
+    ProjectConfig, RepoAnalyzer, RepoToTextConverter, ResultCache, generate_repo_context
+)
+
+# Opening marker of each file in the Shotgun format
+SHOTGUN_HEADER_RE = re.compile(r'^\*#\*#\*(.*)\*#\*#\*begin\*#\*#\*$', re.MULTILINE)
+
+
+def _write(root, rel_path, content="x"):
+    """Create a file below root, creating its directories as needed"""
+    path = os.path.join(root, *rel_path.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return path
+
+
+class TestExclusionMatcher(unittest.TestCase):
+    """Test which files the converter includes"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.test_dir)
+
+    def _included(self, config=None):
+        converter = RepoToTextConverter(config or ProjectConfig(gitignore_import=False))
+        output = converter.generate_shotgun_format(self.test_dir)
+        return sorted(p.replace(os.sep, '/') for p in SHOTGUN_HEADER_RE.findall(output))
+
+    def test_directory_patterns_keep_files_of_that_name(self):
+        """'build/' excludes build directories, not files called build"""
+        for rel_path in ["build", "scripts/build", "src/tmp", "dist", "logs", ".env",
+                         "app/build/out.txt", "lib/tmp/cache.txt", "app/dist/bundle.js"]:
+            _write(self.test_dir, rel_path)
+        self.assertEqual(self._included(), [".env", "build", "dist", "logs", "scripts/build", "src/tmp"])
+
+    def test_user_directory_pattern(self):
+        """A user exclusion like 'docs/' keeps a file named docs"""
+        _write(self.test_dir, "docs")
+        _write(self.test_dir, "guide/docs/index.md")
+        _write(self.test_dir, "src/docs/api.md")
+        config = ProjectConfig(gitignore_import=False, exclude_patterns=["docs/"])
+        self.assertEqual(self._included(config), ["docs"])
+
+    def test_plain_names_match_files_and_directories(self):
+        """Names without a trailing slash match any path component"""
+        _write(self.test_dir, ".DS_Store")
+        _write(self.test_dir, "src/.DS_Store")
+        _write(self.test_dir, "secret/key.txt")
+        _write(self.test_dir, "src/secret")
+        _write(self.test_dir, "src/main.py")
+        config = ProjectConfig(gitignore_import=False, exclude_patterns=["secret"])
+        self.assertEqual(self._included(config), ["src/main.py"])
+
+    def test_extension_glob_and_sub_path_patterns(self):
+        """'*.ext' globs and literal sub-paths match on component boundaries"""
+        for rel_path in ["a.pyc", "a.py", "src/legacy/old.py", "mysrc/legacy/new.py", "pkgs/x.log"]:
+            _write(self.test_dir, rel_path)
+        config = ProjectConfig(gitignore_import=False, exclude_patterns=["src/legacy/"])
+        self.assertEqual(self._included(config), ["a.py", "mysrc/legacy/new.py"])
+
+
+class TestGitignoreNegation(unittest.TestCase):
+    """Test that .gitignore negations re-include files below ignored directories"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.test_dir)
+
+    def _included(self):
+        output = RepoToTextConverter().generate_shotgun_format(self.test_dir)
+        return sorted(p.replace(os.sep, '/') for p in SHOTGUN_HEADER_RE.findall(output))
+
+    def test_whitelist(self):
+        """'*' then '!*/' and '!*.py' keeps Python files in every directory"""
+        _write(self.test_dir, ".gitignore", "*\n!*/\n!*.py\n")
+        for rel_path in ["setup.py", "notes.txt", "src/a.py", "src/a.txt", "secret/s.py"]:
+            _write(self.test_dir, rel_path)
+        self.assertEqual(self._included(), ["secret/s.py", "setup.py", "src/a.py"])
+        _, file_types = RepoAnalyzer.count_file_types(self.test_dir)
+        self.assertEqual(file_types[".py"], 3)
+
+    def test_reincluded_sub_tree(self):
+        """'/data/**' then '!/data/keep/**' keeps the files below data/keep"""
+        _write(self.test_dir, ".gitignore", "/data/**\n!/data/keep/**\n")
+        for rel_path in ["data/rows.csv", "data/keep/k.txt", "src/main.py"]:
+            _write(self.test_dir, rel_path)
+        self.assertEqual(self._included(), [".gitignore", "data/keep/k.txt", "src/main.py"])
+        _, file_types = RepoAnalyzer.count_file_types(self.test_dir)
+        self.assertEqual(file_types[".txt"], 1)
+
+    def test_reincluded_file_invalidates_cache(self):
+        """Editing a re-included file below an ignored directory produces a fresh result"""
+        _write(self.test_dir, ".gitignore", "/data/**\n!/data/keep/**\n")
+        kept = _write(self.test_dir, "data/keep/k.txt", "v1\n")
+        first = generate_repo_context(self.test_dir)
+        self.assertIn("v1", "".join(first))
+        with open(kept, 'w', encoding='utf-8') as f:
+            f.write("v2\n")
+        st = os.stat(kept)
+        os.utime(kept, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.assertIn("v2", "".join(generate_repo_context(self.test_dir)))
+
+
+class TestRepoContextCache(unittest.TestCase):
+    """Test when a cached repo context is reused"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.test_dir = tempfile.mkdtemp()
+        self.main_py = _write(self.test_dir, "src/main.py", "print('v1')\n")
+        self.log_file = _write(self.test_dir, "tmp_out/log.txt", "a\n")
+
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.test_dir)
+
+    def _bump(self, path, content):
+        """Rewrite a file and move its mtime forward so the change is always visible"""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    def test_edit_invalidates(self):
+        """Editing an included file produces a fresh result"""
+        first = generate_repo_context(self.test_dir)
+        self.assertIn("print('v1')", "".join(first))
+        self._bump(self.main_py, "print('v2')\n")
+        second = generate_repo_context(self.test_dir)
+        self.assertIsNot(first, second)
+        self.assertIn("print('v2')", "".join(second))
+
+    def test_excluded_tree_keeps_cache(self):
+        """Changes below excluded directories reuse the cached result"""
+        first = generate_repo_context(self.test_dir, exclusions=["tmp_out/"])
+        self._bump(self.log_file, "b\n")
+        _write(self.test_dir, "tmp_out/more/log.txt")
+        self.assertIs(generate_repo_context(self.test_dir, exclusions=["tmp_out/"]), first)
+
+    def test_gitignored_tree_keeps_cache(self):
+        """Changes below gitignored directories reuse the cached result"""
+        _write(self.test_dir, ".gitignore", "data/\n")
+        data_file = _write(self.test_dir, "data/rows.csv", "a,b\n")
+        first = generate_repo_context(self.test_dir)
+        self._bump(data_file, "c,d\n")
+        _write(self.test_dir, "data/more/rows.csv")
+        self.assertIs(generate_repo_context(self.test_dir), first)
+
+    def test_exclusions_are_part_of_the_key(self):
+        """Different exclusions never share a cache entry"""
+        full = "".join(generate_repo_context(self.test_dir))
+        trimmed = "".join(generate_repo_context(self.test_dir, exclusions=["src/"]))
+        self.assertIn("main.py", full)
+        self.assertNotIn("main.py", trimmed)
+
+
+class TestResultCache(unittest.TestCase):
+    """Test that the result cache is bounded by the characters it holds"""
+
+    def test_evicts_least_recently_used(self):
+        """Entries are evicted oldest first once the total exceeds max_chars"""
+        cache = ResultCache(max_chars=10)
+        cache.put("a", ["1234", "5"])
+        cache.put("b", ("1234", {"types": []}))
+        self.assertEqual(cache.get("a"), ["1234", "5"])
+        cache.put("c", "12345")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), ["1234", "5"])
+        self.assertEqual(cache.get("c"), "12345")
+
+    def test_oversized_result_is_not_cached(self):
+        """A result larger than the whole cache is skipped and evicts nothing"""
+        cache = ResultCache(max_chars=10)
+        cache.put("a", "12345")
+        cache.put("big", ["123456", "789012"])
+        self.assertIsNone(cache.get("big"))
+        self.assertEqual(cache.get("a"), "12345")
+
+    def test_replacing_an_entry(self):
+        """Putting an existing key again counts only the new value"""
+        cache = ResultCache(max_chars=10)
+        cache.put("a", "12345678")
+        cache.put("a", "12")
+        cache.put("b", "12345678")
+        self.assertEqual(cache.get("a"), "12")
+        self.assertEqual(cache.get("b"), "12345678")
+
+
+class TestWriteShotgunToFd(unittest.TestCase):
+    """Test that write_shotgun_to_fd writes exactly what generate_shotgun_format returns"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.test_dir = tempfile.mkdtemp()
+        for i in range(300):
+            _write(self.test_dir, f"pkg{i % 7}/mod_{i}.py", f"value = {i}\n" * (i % 5))
+        _write(self.test_dir, "docs/naïve.md", "caf\u00e9 \u2713\n")
+        with open(os.path.join(self.test_dir, "crlf.txt"), 'wb') as f:
+            f.write(b"one\r\ntwo\r\n")
+        with open(os.path.join(self.test_dir, "blob.dat"), 'wb') as f:
+            f.write(b"\x00\x01binary")
+        # Larger than a pipe buffer, so a single write cannot take it at once
+        _write(self.test_dir, "big/data.txt", "x" * (3 * 1024 * 1024 // 2))
+        self.converter = RepoToTextConverter(ProjectConfig(gitignore_import=False,
+                                                           max_file_size=4 * 1024 * 1024))
+        self.expected = self.converter.generate_shotgun_format(self.test_dir).encode('utf-8')
+
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.test_dir)
+
+    def _write_to_file(self):
+        fd, out_path = tempfile.mkstemp()
+        try:
+            self.converter.write_shotgun_to_fd(self.test_dir, fd)
+        finally:
+            os.close(fd)
+        try:
+            with open(out_path, 'rb') as f:
+                return f.read()
+        finally:
+            os.remove(out_path)
+
+    def test_file(self):
+        """Output to a regular file matches the string version byte for byte"""
+        self.assertIn(b"data.txt", self.expected)
+        self.assertEqual(self._write_to_file(), self.expected)
+
+    def test_pipe(self):
+        """Output to a pipe that fills up matches the string version"""
+        read_fd, write_fd = os.pipe()
+        received = []
+
+        def drain():
+            with os.fdopen(read_fd, 'rb') as f:
+                received.append(f.read())
+
+        reader = threading.Thread(target=drain)
+        reader.start()
+        try:
+            self.converter.write_shotgun_to_fd(self.test_dir, write_fd)
+        finally:
+            os.close(write_fd)
+            reader.join()
+        self.assertEqual(received[0], self.expected)
+
+    @unittest.skipUnless(hasattr(os, 'writev'), "os.writev is not available")
+    def test_short_writes(self):
+        """Buffers a short writev() leaves behind are still written"""
+        def short_writev(fd, buffers):
+            # Accept at most half of what was asked for
+            total = sum(map(len, buffers))
+            return os.write(fd, b''.join(buffers)[:max(1, total // 2)])
+
+        with mock.patch.object(os, 'writev', side_effect=short_writev) as patched:
+            self.assertEqual(self._write_to_file(), self.expected)
+        self.assertGreater(patched.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+from unittest import mock
+
+import repo_to_text_mcp_server
+from repo_to_text_mcp_server import GeminiTaskGenerator, _json_dumps_indented
+
+
+def _parse(response):
+    return GeminiTaskGenerator.parse_gemini_response(response)
+
+
+class TestParseGeminiResponse(unittest.TestCase):
+    """Test how Gemini responses are split into sections"""
+
+    def test_sections(self):
+        """Each header starts a section that runs up to the next header"""
+        tasks = _parse(
+            "Preamble is ignored\n"
+            "# Overview\n"
+            "  Add caching.  \n"
+            "## Architecture Changes\n"
+            "- new module\n"
+            "### Implementation Steps\n"
+            "1. a\n"
+            "2. b\n"
+            "# Testing Strategy\n"
+            "\n"
+            "Unit tests\n"
+            "# Potential Issues\n"
+            "- races"
+        )
+        self.assertEqual(tasks["overview"], "Add caching.")
+        self.assertEqual(tasks["architecture_changes"], ["- new module"])
+        self.assertEqual(tasks["implementation_steps"], ["1. a", "2. b"])
+        self.assertEqual(tasks["testing_strategy"], "Unit tests")
+        self.assertEqual(tasks["potential_issues"], ["- races"])
+        self.assertEqual(tasks["file_modifications"], [])
+        self.assertEqual(tasks["code_examples"], [])
+
+    def test_header_priority(self):
+        """A header naming several sections belongs to the first one in the check order"""
+        tasks = _parse(
+            "# Overview of the test issues\n"
+            "o\n"
+            "# File modifications and architecture\n"
+            "a\n"
+            "# Code examples for tests\n"
+            "c\n"
+            "# Implementation plan\n"
+            "# Testing issues\n"
+            "t"
+        )
+        self.assertEqual(tasks["overview"], "o")
+        self.assertEqual(tasks["architecture_changes"], ["a"])
+        # "Implementation" without "step" is not a header, so it stays in the content
+        self.assertEqual(tasks["code_examples"], ["c", "# Implementation plan"])
+        self.assertEqual(tasks["testing_strategy"], "t")
+        self.assertEqual(tasks["file_modifications"], [])
+        self.assertEqual(tasks["potential_issues"], [])
+
+    def test_headers_need_leading_hash(self):
+        """Section names in ordinary or indented lines are content"""
+        tasks = _parse("# Overview\nThe overview\n  # Testing\nMore")
+        self.assertEqual(tasks["overview"], "The overview\n  # Testing\nMore")
+        self.assertEqual(tasks["testing_strategy"], "")
+
+    def test_empty_sections(self):
+        """Headers with nothing below them leave their sections at the defaults"""
+        tasks = _parse("# Overview\n# Architecture\n# Potential Issues")
+        self.assertEqual(tasks["overview"], "")
+        self.assertEqual(tasks["architecture_changes"], [])
+        self.assertEqual(tasks["potential_issues"], [])
+
+    def test_trailing_newline(self):
+        """A final newline adds an empty line to list sections"""
+        self.assertEqual(_parse("# Overview\n")["overview"], "")
+        self.assertEqual(_parse("# Architecture\n")["architecture_changes"], [""])
+        self.assertEqual(_parse("# Architecture\n- a\n")["architecture_changes"], ["- a", ""])
+
+    def test_crlf(self):
+        """CRLF headers are recognized and content lines keep their carriage returns"""
+        tasks = _parse("# Overview\r\nSummary\r\n# Implementation Steps\r\n1. a\r\n2. b\r\n")
+        self.assertEqual(tasks["overview"], "Summary")
+        self.assertEqual(tasks["implementation_steps"], ["1. a\r", "2. b\r", ""])
+
+    def test_reopened_section(self):
+        """A repeated header replaces the earlier content, unless it is empty"""
+        tasks = _parse(
+            "# Architecture\n- first\n"
+            "# Testing\nt1\n"
+            "# Architecture again\n- second\n"
+            "# Testing\n"
+            "# Issues\n- none"
+        )
+        self.assertEqual(tasks["architecture_changes"], ["- second"])
+        self.assertEqual(tasks["testing_strategy"], "t1")
+        self.assertEqual(tasks["potential_issues"], ["- none"])
+
+
+class TestJsonDumpsIndented(unittest.TestCase):
+    """Test the generic JSON output of parsed tasks"""
+
+    def setUp(self):
+        self.tasks = _parse("# Overview\nCaf\u00e9 \u2713\n# Issues\n- \u00fcber\n- \U0001F680")
+
+    def test_fallback_keeps_non_ascii(self):
+        """Without orjson, non-ASCII text is written as is rather than escaped"""
+        with mock.patch.object(repo_to_text_mcp_server, 'orjson', None):
+            text = _json_dumps_indented(self.tasks)
+        self.assertIn('"overview": "Caf\u00e9 \u2713"', text)
+        self.assertIn('"- \U0001F680"', text)
+        self.assertNotIn('\\u', text)
+
+    @unittest.skipIf(repo_to_text_mcp_server.orjson is None, "orjson is not installed")
+    def test_orjson_matches_fallback(self):
+        """orjson and the json fallback produce the same text"""
+        with mock.patch.object(repo_to_text_mcp_server, 'orjson', None):
+            fallback = _json_dumps_indented(self.tasks)
+        self.assertEqual(_json_dumps_indented(self.tasks), fallback)
+
+
+if __name__ == '__main__':
+    unittest.main()